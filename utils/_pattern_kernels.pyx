@@ -0,0 +1,32 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Cython version of the pattern kernel used by `time_series_generators.generate_pattern_data`
+
+Optional, build it in place with `cythonize -i -a utils/_pattern_kernels.pyx`.
+When the compiled extension is missing the Numba (or plain NumPy) kernel is used instead.
+"""
+
+from cython cimport floating
+from libc.stdint cimport int64_t, uint8_t
+
+
+def add_std_patterns(floating[::1] data, const int64_t[::1] starts, const int64_t[::1] lengths,
+                     const int64_t[::1] tags, const double[::1] amplitudes, const uint8_t[::1] negatives):
+    """
+    Adds the bell/funnel/cylinder shapes (picked by an integer tag) onto the noise of each segment, in place
+    """
+    cdef Py_ssize_t k, j
+    cdef int64_t current_start, current_length
+    cdef double amp, value
+    for k in range(starts.shape[0]):
+        current_start = starts[k]
+        current_length = lengths[k]
+        amp = amplitudes[k]
+        for j in range(current_length):
+            if tags[k] == 0:
+                value = data[current_start + j] + amp * j / current_length
+            elif tags[k] == 1:
+                value = data[current_start + j] + amp * (current_length - 1 - j) / current_length
+            else:
+                value = data[current_start + j] + amp
+            data[current_start + j] = -value if negatives[k] else value
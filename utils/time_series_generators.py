@@ -1,9 +1,25 @@
 import numpy as np
-import random
-import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional, the kernels below then run as plain Python/NumPy
+    def njit(func):
+        return func
+
+# Optional Cython build of the pattern kernel, see _pattern_kernels.pyx
+try:
+    from ._pattern_kernels import add_std_patterns as _add_std_patterns_cy
+except ImportError:
+    try:
+        from _pattern_kernels import add_std_patterns as _add_std_patterns_cy
+    except ImportError:
+        _add_std_patterns_cy = None
+
 def generate_bell(length, amplitude, default_variance):
     bell = np.random.normal(0, default_variance, length) + amplitude * np.arange(length)/length
     return bell
@@ -18,12 +34,64 @@ def generate_cylinder(length, amplitude, default_variance):
 
 std_generators = [generate_bell, generate_funnel, generate_cylinder]
 
+def _draw_segments(rng, length, avg_pattern_length, avg_amplitude,
+                   variance_pattern_length, variance_amplitude, include_negatives):
+    """
+    Draws the layout of all the patterns up front: start, length, amplitude and sign of each segment
+    """
+    # A segment spans its pattern plus the gap before it, about 1.5 * avg_pattern_length on average.
+    # The first batch is sized from that with a small margin, the loop below covers a shortfall
+    n_seg = int(1.05 * length / max(1, 1.5 * avg_pattern_length)) + 16
+    while True:
+        lengths = rng.normal(avg_pattern_length, variance_pattern_length, n_seg)
+        np.ceil(lengths, out=lengths)
+        np.maximum(lengths, 1, out=lengths)
+        lengths = lengths.astype(np.int64)
+        # End of segment k is the running sum of the gaps and lengths up to k
+        ends = rng.integers(0, avg_pattern_length + 1, n_seg)
+        ends += lengths
+        np.cumsum(ends, out=ends)
+        if ends[-1] >= length:
+            break
+        n_seg *= 2
+    # Segment ends strictly increase, the patterns are the ones ending before `length`
+    k = np.searchsorted(ends, length)
+    lengths = lengths[:k]
+    starts = ends[:k] - lengths
+    amplitudes = rng.normal(avg_amplitude, variance_amplitude, k)
+    negatives = (rng.random(k) > 0.5) & include_negatives
+    return starts, lengths, amplitudes, negatives
+
+@njit
+def _add_std_patterns(data, starts, lengths, tags, amplitudes, negatives):
+    """
+    Adds the bell/funnel/cylinder shapes (picked by an integer tag) onto the noise of each segment
+    """
+    for k in range(starts.shape[0]):
+        current_length = lengths[k]
+        segment = data[starts[k] : starts[k] + current_length]
+        if tags[k] == 0:
+            segment += amplitudes[k] * np.arange(current_length)/current_length
+        elif tags[k] == 1:
+            segment += amplitudes[k] * np.arange(current_length)[::-1]/current_length
+        else:
+            segment += amplitudes[k]
+        if negatives[k]:
+            segment *= -1
+    return data
+
 def generate_pattern_data(length=100, avg_pattern_length=5, avg_amplitude=1, 
                           default_variance = 1, variance_pattern_length = 10, variance_amplitude = 2, 
-                          generators = std_generators, include_negatives = True):
+                          generators = std_generators, include_negatives = True, seed = None,
+                          dtype = np.float64):
     """
     Generates 1-D time sereies using compositions of randomized series and customized patterns
     
+    `seed` is passed to `np.random.default_rng` and may also be an existing Generator.
+    Custom `generators` are called as `generator(length, amplitude, default_variance)`
+    and draw their noise from their own random source.
+    `dtype` may be `np.float32` to halve the memory of long series.
+    
     Example
     ------------
     n_data= [50, 150, 500]
@@ -40,31 +108,32 @@ def generate_pattern_data(length=100, avg_pattern_length=5, avg_amplitude=1,
         i+=1
     plt.show()
     """
-    data = np.random.normal(0, default_variance, length)
-    current_start = random.randint(0, avg_pattern_length)
-    current_length = current_length = max(1, math.ceil(random.gauss(avg_pattern_length, variance_pattern_length)))
+    rng = np.random.default_rng(seed)
+    data = np.empty(length, dtype=dtype)
+    rng.standard_normal(dtype=dtype, out=data)
+    data *= default_variance
+    starts, lengths, amplitudes, negatives = _draw_segments(rng, length, avg_pattern_length, avg_amplitude,
+                                                            variance_pattern_length, variance_amplitude,
+                                                            include_negatives)
+    tags = rng.integers(0, len(generators), len(starts))
+    if generators is std_generators:
+        # The base noise of a segment is reused as the noise of its pattern
+        if _add_std_patterns_cy is not None:
+            _add_std_patterns_cy(data, starts, lengths, tags, amplitudes, negatives.view(np.uint8))
+            return data
+        return _add_std_patterns(data, starts, lengths, tags, amplitudes, negatives)
     
-    while current_start + current_length < length:
-        generator = random.choice(generators)
-        current_amplitude = random.gauss(avg_amplitude, variance_amplitude)
-        
-        while current_length <= 0:
-            current_length = -(current_length-1)
-        pattern = generator(current_length, current_amplitude, default_variance)
-        
-        if include_negatives and random.random() > 0.5:
+    for k in range(len(starts)):
+        pattern = generators[tags[k]](lengths[k], amplitudes[k], default_variance)
+        if negatives[k]:
             pattern = -1 * pattern
-            
-        data[current_start : current_start + current_length] = pattern
-        
-        current_start = current_start + current_length + random.randint(0, avg_pattern_length)
-        current_length = max(1, math.ceil(random.gauss(avg_pattern_length, variance_pattern_length)))
+        data[starts[k] : starts[k] + lengths[k]] = pattern
     
-    return np.array(data)
+    return data
 
 def gen_series_anomaly(size=1000,
                     anomaly_frac=0.02,anomaly_scale=2.0,
-                    loc=0.0,scale=1.0):
+                    loc=0.0,scale=1.0,seed=None):
     """
     Generates a time-series data (array) with some anomalies
     
@@ -74,20 +143,28 @@ def gen_series_anomaly(size=1000,
         anomaly_scale: Scale factor of anomalies
         loc: Parameter (mean) for the underlying Gaussian distribution
         scale: Parameter (std.dev) for the underlying Gaussian distribution
+        seed: Seed for `np.random.default_rng`, or an existing numpy Generator
     """
 
-    arr = np.random.normal(loc=loc,scale=scale,size=size)
+    rng = np.random.default_rng(seed)
+    arr = rng.normal(loc=loc,scale=scale,size=size)
     arr_min = arr.min()
     arr_max = arr.max()
     no_anomalies = int(size*anomaly_frac)
-    idx_list=np.random.choice(a=size,size=no_anomalies,replace=False)
-    for idx in idx_list:
-        arr[idx] = loc+np.random.uniform(low=arr_min-anomaly_scale*(arr_max-arr_min),high=arr_max+anomaly_scale*(arr_max-arr_min))
+    idx_list=rng.choice(a=size,size=no_anomalies,replace=False,shuffle=False)
+    scaled = anomaly_scale*(arr_max-arr_min)
+    arr[idx_list] = loc+rng.uniform(low=arr_min-scaled,high=arr_max+scaled,size=no_anomalies)
     return arr
 
+def _gen_one(args):
+    seed, size, anomaly_frac, anomaly_scale, loc, scale = args
+    return gen_series_anomaly(size=size,
+                              anomaly_frac=anomaly_frac,anomaly_scale=anomaly_scale,
+                              loc=loc,scale=scale,seed=seed)
+
 def gen_ts_dataframe(n=10,prob_anomolous=0.1,
                     size=1000,anomaly_frac=0.02,anomaly_scale=2.0,
-                    loc=0.0,scale=1.0):
+                    loc=0.0,scale=1.0,seed=None,n_jobs=1):
     """
     Generates dataframe of time-series containing 'normal' and 'anomolous' samples
     
@@ -99,6 +176,9 @@ def gen_ts_dataframe(n=10,prob_anomolous=0.1,
         anomaly_scale: Scale factor of anomalies
         loc: Parameter (mean) for the underlying Gaussian distribution
         scale: Parameter (std.dev) for the underlying Gaussian distribution
+        seed: Seed for `np.random.default_rng`, or an existing numpy Generator
+        n_jobs: Number of worker processes generating the series, None uses all cores.
+                Every series gets its own seed, so the result does not depend on n_jobs
     
     Returns:
         A dataframe of shape (n,2) where the first column contains time-series data as list 
@@ -106,17 +186,23 @@ def gen_ts_dataframe(n=10,prob_anomolous=0.1,
     """
     assert prob_anomolous < 1.0, print("Probability of anomaly cannot be equal to or greater than 1.0")
     
-    dt = {}
-    for i in range(n):
-        anomolous = np.random.uniform()
-        if anomolous < prob_anomolous:
-            dt[str(i)] = [gen_series_anomaly(size=size,
-                                     anomaly_frac=anomaly_frac,anomaly_scale=anomaly_scale,
-                                     loc=loc,scale=scale),1]
-        else:
-            dt[str(i)] = [gen_series_anomaly(size=size,
-                                     anomaly_frac=0.0,anomaly_scale=anomaly_scale,
-                                     loc=loc,scale=scale),0]
-    df = pd.DataFrame(dt).T
-    df.columns = ['ts','anomolous']
-    return df
\ No newline at end of file
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(2**63, size=n)
+    is_anom = rng.random(n) < prob_anomolous
+    labels = is_anom.astype(np.int8)
+    args_list = [(seeds[i],size,anomaly_frac if is_anom[i] else 0.0,anomaly_scale,loc,scale)
+                 for i in range(n)]
+    
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    # Filled element-wise, assigning the arrays in one go would broadcast them into 2-D
+    ts_col = np.empty(n, dtype=object)
+    if n_jobs > 1 and n > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            for i, arr in enumerate(ex.map(_gen_one, args_list, chunksize=max(1,n//(8*n_jobs)))):
+                ts_col[i] = arr
+    else:
+        for i, args in enumerate(args_list):
+            ts_col[i] = _gen_one(args)
+    df = pd.DataFrame({'ts':ts_col,'anomolous':labels}, copy=False)
+    return df
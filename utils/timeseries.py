@@ -1,9 +1,22 @@
 # TimeSeries module
 
+from functools import cached_property
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+# Long series are stride-sampled down to about this many points when plotted
+MAX_PLOT_POINTS = 10_000
+
+
+def _anomaly_bounds(arr_min, arr_range, anomaly_scale, one_sided):
+    # Bounds of the uniform draw for the anomalies, resolved once per call
+    scaled = anomaly_scale * arr_range
+    if one_sided:
+        return arr_min, scaled
+    return -scaled, scaled
+
 
 class SyntheticTS:
     """
@@ -15,6 +28,7 @@ class SyntheticTS:
         start_time="2021-01-01 00:00:00",
         end_time="2021-01-02 00:00:00",
         process_time_mins=10,
+        seed=None,
     ):
         """
         Initialize
@@ -23,26 +37,35 @@ class SyntheticTS:
             start_time (str): Start time in the format 'YYYY-MM-DD hh:mm:ss'
             end_time (str): End time in the format 'YYYY-MM-DD hh:mm:ss'
             process_time_mins (float): Time (in minutes) for the unit process
+            seed (int): Seed for the random number generator (`numpy.random.default_rng`).
+            Default=None i.e. fresh entropy on every instantiation.
 
         Returns: None
         """
         self.start_time = start_time
         self.end_time = end_time
         self.process_time = process_time_mins
+        self._rng = np.random.default_rng(seed)
         self._duration_ = np.datetime64(self.end_time) - np.datetime64(self.start_time)
         self._minutes_ = self._duration_ / np.timedelta64(1, "m")
         self._size_ = int(self._minutes_ / (self.process_time))
-        self.time_arr = np.arange(
+
+        self._normal_flag_ = False
+        self._anomaly_flag_ = False
+        self._drifted_flag_ = False
+
+    @cached_property
+    def time_arr(self):
+        """
+        Datetime values of the process, built on first use
+        """
+        return np.arange(
             self.start_time,
             self.end_time,
             step=self.process_time,
             dtype="datetime64[m]",
         )
 
-        self._normal_flag_ = False
-        self._anomaly_flag_ = False
-        self._drifted_flag_ = False
-
     def __repr__(self):
         return "Customized synthetic time series class"
 
@@ -60,6 +83,7 @@ class SyntheticTS:
         loc=0.0,
         scale=1.0,
         return_df=True,
+        dtype=np.float64,
     ):
         """
         Initiates the normal process data
@@ -67,6 +91,8 @@ class SyntheticTS:
         Args:
             loc (float): Parameter (mean) for the underlying Gaussian distribution
             scale (float): Parameter (std.dev) for the underlying Gaussian distribution
+            dtype (numpy.dtype): Floating point type of the data, `np.float64` or `np.float32`.
+            `np.float32` halves the memory and is plenty of precision for most ML uses. Default=np.float64
 
         Returns:
             Pandas DataFrame: If `return_df=True` returns a dataframe with two columns -
@@ -75,7 +101,9 @@ class SyntheticTS:
         """
         self.loc = loc
         self.scale = scale
-        arr = np.random.normal(loc=self.loc, scale=self.scale, size=self._size_)
+        arr = self._rng.standard_normal(size=self._size_, dtype=dtype)
+        arr *= self.scale
+        arr += self.loc
         self.normal_data = arr
         self._normal_flag_ = True
         if return_df:
@@ -85,7 +113,12 @@ class SyntheticTS:
             return self.normal_data
 
     def anomalize(
-        self, anomaly_frac=0.02, anomaly_scale=1.0, one_sided=False, return_df=True
+        self,
+        anomaly_frac=0.02,
+        anomaly_scale=1.0,
+        one_sided=False,
+        return_df=True,
+        copy=True,
     ):
         """
         Induces anomalies in the normal process
@@ -97,6 +130,8 @@ class SyntheticTS:
         one_sided (bool): Indicates whether the anomalies/outliers are one-sided in magnitude
         i.e. they are mostly higher in magnitude than the normal process data. Default=False
         i.e. outliers appear in both smaller and larger magnitude compared to the normal process data.
+        copy (bool): Whether to work on a copy of the normal process data. Default=True.
+        `copy=False` writes the anomalies in place to save memory, which invalidates `self.normal_data`.
 
         Returns:
             Pandas DataFrame: If `return_df=True` returns a dataframe with two columns -
@@ -112,21 +147,21 @@ class SyntheticTS:
         assert anomaly_scale > 0, print(
             "Anomaly scale must be a number gerater than 0.0"
         )
-        new_arr = self.normal_data.copy()
+        new_arr = self.normal_data.copy() if copy else self.normal_data
         arr_min = new_arr.min()
         arr_max = new_arr.max()
+        arr_range = arr_max - arr_min
         no_anomalies = int(self._size_ * anomaly_frac)
-        idx_list = np.random.choice(a=self._size_, size=no_anomalies, replace=False)
-        for idx in idx_list:
-            if one_sided:
-                new_arr[idx] = self.loc + np.random.uniform(
-                    low=arr_min, high=anomaly_scale * (arr_max - arr_min)
-                )
-            else:
-                new_arr[idx] = self.loc + np.random.uniform(
-                    low=-anomaly_scale * (arr_max - arr_min),
-                    high=anomaly_scale * (arr_max - arr_min),
-                )
+        # Generator.choice already avoids a full permutation (partial Fisher-Yates or
+        # Floyd's algorithm), and the order of the indices is irrelevant here so the
+        # final shuffle is skipped
+        idx_list = self._rng.choice(
+            a=self._size_, size=no_anomalies, replace=False, shuffle=False
+        )
+        low, high = _anomaly_bounds(arr_min, arr_range, anomaly_scale, one_sided)
+        new_arr[idx_list] = self.loc + self._rng.uniform(
+            low=low, high=high, size=no_anomalies
+        )
         self.anomalized_data = new_arr
         self._anomaly_flag_ = True
 
@@ -142,30 +177,18 @@ class SyntheticTS:
         m = arr.mean()
         a_max = arr.max()
         a_min = arr.min()
-        idx_chunks = []
-        data_chunks = []
-        idx_a = np.arange(len(arr))
+        a_range = a_max - a_min
         div = int(len(arr) / (num_chunk))
-        for i in range(0, len(arr), div):
-            idx_chunks.append(idx_a[i : i + div])
-        for idx in idx_chunks[:-1]:
-            tmpa = arr[idx]
-            mid = int(len(tmpa) / 2)
-            for j in range(mid - int(chunk_size / 2), mid + int(chunk_size / 2) + 1):
-                if one_sided:
-                    tmpa[j] = m + np.random.uniform(
-                        low=a_min, high=ano_scale * (a_max - a_min)
-                    )
-                else:
-                    tmpa[j] = m + np.random.uniform(
-                        low=-ano_scale * (a_max - a_min),
-                        high=ano_scale * (a_max - a_min),
-                    )
-            data_chunks.append(tmpa)
-        a1 = np.array([])
-        for d in data_chunks:
-            a1 = np.append(a1, d)
-        return a1
+        # The trailing (possibly partial) chunk is dropped
+        end = (-(-len(arr) // div) - 1) * div
+        low, high = _anomaly_bounds(a_min, a_range, ano_scale, one_sided)
+        mid = int(div / 2)
+        lo = max(0, mid - int(chunk_size / 2))
+        hi = mid + int(chunk_size / 2) + 1
+        for i in range(0, end, div):
+            window = arr[i : i + div][lo:hi]
+            window[:] = m + self._rng.uniform(low=low, high=high, size=len(window))
+        return arr[:end]
 
     def chunk_anomalize(
         self,
@@ -174,6 +197,7 @@ class SyntheticTS:
         anomaly_scale=1.0,
         one_sided=False,
         return_df=True,
+        copy=True,
     ):
         """
         Induces anomaly chunks in the normal process data
@@ -186,6 +210,8 @@ class SyntheticTS:
         one_sided (bool): Indicates whether the anomalies/outliers are one-sided in magnitude
         i.e. they are mostly higher in magnitude than the normal process data. Default=False
         i.e. outliers appear in both smaller and larger magnitude compared to the normal process data.
+        copy (bool): Whether to work on a copy of the normal process data. Default=True.
+        `copy=False` writes the anomalies in place to save memory, which invalidates `self.normal_data`.
 
         Returns:
             Pandas DataFrame: If `return_df=True` returns a dataframe with two columns -
@@ -207,7 +233,7 @@ class SyntheticTS:
         no_anomalies = int(self._size_ * anomaly_frac)
         no_anomalies_chunk = int(no_anomalies / num_chunks)
         anomalies_last_chunk = no_anomalies - (no_anomalies_chunk * num_chunks)
-        new_arr = self.normal_data.copy()
+        new_arr = self.normal_data.copy() if copy else self.normal_data
         new_arr = self._chunk(
             arr=new_arr,
             num_chunk=num_chunks,
@@ -259,12 +285,12 @@ class SyntheticTS:
             self._duration_before_drift_
             / (np.timedelta64(1, "m") * (self.process_time))
         )
-        self.before_drift_data = self.anomalized_data[: self._drift_idx_]
-        self.after_drift_data = self.anomalized_data[self._drift_idx_ :]
-        self.after_drift_data = self.after_drift_data + self.after_drift_data.mean() * (
+        self.drifted_data = self.anomalized_data.copy()
+        self.before_drift_data = self.drifted_data[: self._drift_idx_]
+        self.after_drift_data = self.drifted_data[self._drift_idx_ :]
+        self.after_drift_data += self.after_drift_data.mean() * (
             self._pct_drift_mean_ / 100
         ) * (1 + self._pct_drift_spread_ / 100)
-        self.drifted_data = np.append(self.before_drift_data, self.after_drift_data)
         self._drifted_flag_ = True
 
         if return_df:
@@ -277,45 +303,57 @@ class SyntheticTS:
 
     def plot_normal(self):
         """
-        Plots normal data
+        Plots normal data, downsampled to about `MAX_PLOT_POINTS` points
         """
 
         if not self._normal_flag_:
             print("Nothing initialized")
             return None
         else:
+            step = max(1, len(self.time_arr) // MAX_PLOT_POINTS)
             plt.figure(figsize=(12, 4))
             plt.scatter(
-                self.time_arr, self.normal_data, edgecolor="k", color="lightblue"
+                self.time_arr[::step],
+                self.normal_data[::step],
+                edgecolor="k",
+                color="lightblue",
             )
             plt.show()
 
     def plot_anomaly(self):
         """
-        Plots anomalized data
+        Plots anomalized data, downsampled to about `MAX_PLOT_POINTS` points
         """
 
         if not self._anomaly_flag_:
             print("Nothing anomalized")
             return None
         else:
+            step = max(1, len(self.time_arr) // MAX_PLOT_POINTS)
             plt.figure(figsize=(12, 4))
             plt.scatter(
-                self.time_arr, self.anomalized_data, edgecolor="k", color="lightblue"
+                self.time_arr[::step],
+                self.anomalized_data[::step],
+                edgecolor="k",
+                color="lightblue",
             )
             plt.show()
 
     def plot_drifted(self):
         """
-        Plots drifted data
+        Plots drifted data, downsampled to about `MAX_PLOT_POINTS` points
         """
 
         if not self._drifted_flag_:
             print("Nothing drifted")
             return None
         else:
+            step = max(1, len(self.time_arr) // MAX_PLOT_POINTS)
             plt.figure(figsize=(12, 4))
             plt.scatter(
-                self.time_arr, self.drifted_data, edgecolor="k", color="lightblue"
+                self.time_arr[::step],
+                self.drifted_data[::step],
+                edgecolor="k",
+                color="lightblue",
             )
             plt.show()
\ No newline at end of file